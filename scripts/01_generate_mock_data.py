@@ -14,19 +14,18 @@ processing measuring instruments under MID Module B and D.
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import random
 import os
 
-# Fixed seed for reproducibility
+# Fixed seed for reproducibility - SFC64 is faster than the legacy MT19937
 RANDOM_SEED = 42
-np.random.seed(RANDOM_SEED)
-random.seed(RANDOM_SEED)
+rng = np.random.default_rng(np.random.SFC64(RANDOM_SEED))
 
 # --- CONFIG ---
 NUM_CLIENTS = 50
 NUM_APPLICATIONS = 300
 START_DATE = datetime(2024, 1, 1)
 END_DATE = datetime(2025, 12, 31)
+DATE_FORMAT = '%Y-%m-%d'
 
 # Client distributions - SMEs dominate but often have less mature QMS
 MANUFACTURER_SIZE_DIST = {'SME': 0.65, 'Large': 0.35}
@@ -87,26 +86,48 @@ MODULE_D_FAILURE_REASONS = {
     'Corrective action records missing': 0.05
 }
 
+# Keys/probabilities as arrays, built once per distribution for batch sampling
+_DIST_CACHE = {
+    id(dist): (np.array(list(dist), dtype=object), np.array(list(dist.values())))
+    for dist in (MANUFACTURER_SIZE_DIST, SECTOR_DIST, INSTRUMENT_TYPE_DIST, MID_MODULE_DIST,
+                 RISK_CLASS_DIST, MODULE_B_FAILURE_REASONS, MODULE_D_FAILURE_REASONS)
+}
+
 
-def weighted_choice(dist):
-    """Random choice weighted by probability distribution."""
-    return np.random.choice(list(dist.keys()), p=list(dist.values()))
+def weighted_choice(dist, n=None):
+    """Random choice(s) weighted by probability distribution."""
+    keys, probs = _DIST_CACHE.get(id(dist)) or (list(dist.keys()), list(dist.values()))
+    return rng.choice(keys, size=n, p=probs)
 
 
-def random_date(start, end):
-    """Random date between start and end."""
+def random_date(start, end, n):
+    """n random dates between start and end (inclusive)."""
     delta = (end - start).days
-    return start + timedelta(days=random.randint(0, delta))
+    offsets = rng.integers(0, delta + 1, size=n).astype('timedelta64[D]')
+    return np.datetime64(start.date()) + offsets
+
 
+def fmt_client_id(ids):
+    return 'CLI' + ids.astype(str).str.zfill(4)
 
-def fmt_client_id(n):
-    return f"CLI{n:04d}"
+def fmt_app_id(ids):
+    return 'APP' + ids.astype(str).str.zfill(5)
 
-def fmt_app_id(n):
-    return f"APP{n:05d}"
+def fmt_audit_id(ids):
+    return 'AUD' + ids.astype(str).str.zfill(5)
+
+
+# IDs stay int32 while generating and are only formatted on write
+ID_FORMATTERS = {
+    'client_id': fmt_client_id,
+    'application_id': fmt_app_id,
+    'audit_id': fmt_audit_id
+}
 
-def fmt_audit_id(n):
-    return f"AUD{n:05d}"
+
+def format_ids(df):
+    """Render integer ID columns in their CSV form, e.g. 42 -> CLI0042."""
+    return df.assign(**{col: fmt(df[col]) for col, fmt in ID_FORMATTERS.items() if col in df})
 
 
 def generate_clients(n):
@@ -117,143 +138,142 @@ def generate_clients(n):
     suffixes = ['Meters', 'Instruments', 'Systems', 'Technologies', 'Solutions',
                 'Metering', 'Devices', 'Engineering', 'Manufacturing', 'Industries']
     
-    clients = []
-    for i in range(1, n + 1):
-        name = f"{random.choice(prefixes)} {random.choice(suffixes)} {'Ltd' if random.random() > 0.5 else 'GmbH'}"
-        clients.append({
-            'client_id': fmt_client_id(i),
-            'company_name': name,
-            'manufacturer_size': weighted_choice(MANUFACTURER_SIZE_DIST),
-            'sector': weighted_choice(SECTOR_DIST)
-        })
+    prefix = np.array(prefixes, dtype=object)[rng.integers(0, len(prefixes), size=n)]
+    suffix = np.array(suffixes, dtype=object)[rng.integers(0, len(suffixes), size=n)]
+    legal = np.where(rng.random(n) > 0.5, 'Ltd', 'GmbH').astype(object)
+    
+    df = pd.DataFrame({
+        'client_id': np.arange(1, n + 1, dtype=np.int32),
+        'company_name': prefix + ' ' + suffix + ' ' + legal,
+        'manufacturer_size': weighted_choice(MANUFACTURER_SIZE_DIST, n),
+        'sector': weighted_choice(SECTOR_DIST, n)
+    })
     
     print(f"Generated {n} clients")
-    return pd.DataFrame(clients)
+    return df
 
 
 def generate_applications(n, clients_df):
     """Generate applications fact table."""
-    client_sectors = clients_df.set_index('client_id')['sector'].to_dict()
+    client_sectors = clients_df.set_index('client_id')['sector']
+    
+    client_ids = rng.choice(clients_df['client_id'].to_numpy(), size=n)
+    sectors = pd.Series(client_ids).map(client_sectors).to_numpy()
+    
+    # Instrument type influenced by sector, falling back to the overall mix
+    instr = weighted_choice(INSTRUMENT_TYPE_DIST, n)
+    rand = rng.random(n)
+    energy = (sectors == 'Energy') & (rand < 0.8)
+    instr[energy] = rng.choice(['Gas Meter', 'Electricity Meter'], size=energy.sum())
+    instr[(sectors == 'Utilities') & (rand < 0.7)] = 'Water Meter'
+    instr[(sectors == 'Retail Fuel') & (rand < 0.7)] = 'Dispenser'
+    instr[(sectors == 'Transportation') & (rand < 0.6)] = 'Taximeter'
     
-    apps = []
-    for i in range(1, n + 1):
-        client_id = random.choice(clients_df['client_id'].tolist())
-        sector = client_sectors[client_id]
-        
-        # Instrument type influenced by sector
-        if sector == 'Energy' and random.random() < 0.8:
-            instr = random.choice(['Gas Meter', 'Electricity Meter'])
-        elif sector == 'Utilities' and random.random() < 0.7:
-            instr = 'Water Meter'
-        elif sector == 'Retail Fuel' and random.random() < 0.7:
-            instr = 'Dispenser'
-        elif sector == 'Transportation' and random.random() < 0.6:
-            instr = 'Taximeter'
-        else:
-            instr = weighted_choice(INSTRUMENT_TYPE_DIST)
-        
-        apps.append({
-            'application_id': fmt_app_id(i),
-            'client_id': client_id,
-            'submission_date': random_date(START_DATE, END_DATE).strftime('%Y-%m-%d'),
-            'instrument_type': instr,
-            'mid_module': weighted_choice(MID_MODULE_DIST),
-            'risk_class': weighted_choice(RISK_CLASS_DIST)
-        })
+    df = pd.DataFrame({
+        'application_id': np.arange(1, n + 1, dtype=np.int32),
+        'client_id': client_ids,
+        'submission_date': random_date(START_DATE, END_DATE, n),
+        'instrument_type': instr,
+        'mid_module': weighted_choice(MID_MODULE_DIST, n),
+        'risk_class': weighted_choice(RISK_CLASS_DIST, n)
+    })
     
-    df = pd.DataFrame(apps).sort_values('submission_date').reset_index(drop=True)
+    df = df.sort_values('submission_date').reset_index(drop=True)
     print(f"Generated {n} applications")
     return df
 
 
 def generate_cert_results(apps_df, clients_df):
     """Generate certification outcomes."""
-    client_sizes = clients_df.set_index('client_id')['manufacturer_size'].to_dict()
+    client_sizes = clients_df.set_index('client_id')['manufacturer_size']
     
-    results = []
-    for _, app in apps_df.iterrows():
-        module = app['mid_module']
-        mfr_size = client_sizes[app['client_id']]
-        submission = datetime.strptime(app['submission_date'], '%Y-%m-%d')
-        
-        pass_rate = FIRST_TIME_PASS_RATES.get((module, mfr_size), 0.55)
-        passed = 1 if random.random() < pass_rate else 0
-        
-        if passed:
-            revisions = 0
-        else:
-            revisions = np.random.choice([1, 2, 3, 4], p=[0.45, 0.30, 0.15, 0.10])
-        
-        base_days = BASE_TURNAROUND_DAYS[module]
-        total_days = int(base_days + revisions * DAYS_PER_REVISION + random.randint(-10, 10))
-        cert_date = submission + timedelta(days=total_days)
-        
-        # Recent apps might still be pending
-        is_recent = submission > END_DATE - timedelta(days=90)
-        is_pending = is_recent and random.random() < 0.15
-        
-        results.append({
-            'application_id': app['application_id'],
-            'passed_first_time': passed,
-            'total_revisions': int(revisions),
-            'certification_date': None if is_pending else cert_date.strftime('%Y-%m-%d')
-        })
+    n = len(apps_df)
+    modules = apps_df['mid_module'].to_numpy()
+    sizes = apps_df['client_id'].map(client_sizes).to_numpy()
+    submission = apps_df['submission_date']
     
-    df = pd.DataFrame(results)
+    pass_rate = np.select(
+        [(modules == m) & (sizes == s) for m, s in FIRST_TIME_PASS_RATES],
+        list(FIRST_TIME_PASS_RATES.values()),
+        default=0.55
+    )
+    passed = (rng.random(n) < pass_rate).astype(np.int8)
+    revisions = np.where(passed == 1, 0,
+                         rng.choice([1, 2, 3, 4], size=n, p=[0.45, 0.30, 0.15, 0.10]))
+    
+    base_days = np.where(modules == 'B', BASE_TURNAROUND_DAYS['B'], BASE_TURNAROUND_DAYS['D'])
+    total_days = base_days + revisions * DAYS_PER_REVISION + rng.integers(-10, 11, size=n)
+    cert_date = submission + pd.to_timedelta(total_days, unit='D')
+    
+    # Recent apps might still be pending
+    is_recent = (submission > END_DATE - timedelta(days=90)).to_numpy()
+    is_pending = is_recent & (rng.random(n) < 0.15)
+    
+    df = pd.DataFrame({
+        'application_id': apps_df['application_id'].to_numpy(),
+        'passed_first_time': passed,
+        'total_revisions': revisions.astype(int),
+        'certification_date': cert_date.mask(is_pending).to_numpy()
+    })
     print(f"Generated {len(df)} certification results (pass rate: {df['passed_first_time'].mean()*100:.1f}%)")
     return df
 
 
+def _expand_audits(total_audits, span, days_between):
+    """Expand per-application counts to one row per audit.
+    
+    Returns (day offset from submission, is-final flag, application index)
+    for each audit, computed on int64 arrays without a per-application loop.
+    """
+    total_audits = np.asarray(total_audits, dtype=np.int64)
+    span = np.asarray(span, dtype=np.int64)
+    days_between = np.asarray(days_between, dtype=np.int64)
+    
+    app_idx = np.repeat(np.arange(len(total_audits)), total_audits)
+    starts = np.cumsum(total_audits) - total_audits
+    i = np.arange(total_audits.sum()) - starts[app_idx]
+    
+    offsets = np.minimum((i + 1) * days_between[app_idx], span[app_idx])
+    is_final = i == total_audits[app_idx] - 1
+    return offsets, is_final, app_idx
+
+
 def generate_audit_results(apps_df, cert_df):
     """Generate audit events with module-specific failure reasons."""
-    app_modules = apps_df.set_index('application_id')['mid_module'].to_dict()
-    app_submissions = apps_df.set_index('application_id')['submission_date'].to_dict()
-    cert_dates = cert_df.set_index('application_id')['certification_date'].to_dict()
-    revisions = cert_df.set_index('application_id')['total_revisions'].to_dict()
+    merged = apps_df[['application_id', 'submission_date', 'mid_module']].merge(
+        cert_df[['application_id', 'total_revisions', 'certification_date']], on='application_id')
+    
+    modules = merged['mid_module'].to_numpy()
+    revisions = merged['total_revisions'].to_numpy()
+    submission = merged['submission_date']
+    cert_date = merged['certification_date']
+    is_certified = cert_date.notna().to_numpy()
+    
+    total_audits = 1 + revisions
+    
+    # Pending apps have no cert date - assume the expected span
+    base_days = np.where(modules == 'B', BASE_TURNAROUND_DAYS['B'], BASE_TURNAROUND_DAYS['D'])
+    expected_span = base_days + revisions * DAYS_PER_REVISION
+    span = np.where(is_certified, (cert_date - submission).dt.days.fillna(0).to_numpy(), expected_span).astype(int)
+    days_between = np.where(total_audits > 1, span // total_audits, span)
     
-    audits = []
-    audit_num = 1
+    offset, is_final, app_idx = _expand_audits(total_audits, span, days_between)
+    audit_date = submission.to_numpy()[app_idx] + offset.astype('timedelta64[D]')
     
-    for app_id in apps_df['application_id']:
-        module = app_modules[app_id]
-        submission = datetime.strptime(app_submissions[app_id], '%Y-%m-%d')
-        cert_date_str = cert_dates[app_id]
-        num_revisions = revisions[app_id]
-        
-        total_audits = 1 + num_revisions
-        
-        if cert_date_str:
-            cert_date = datetime.strptime(cert_date_str, '%Y-%m-%d')
-            span = (cert_date - submission).days
-        else:
-            span = BASE_TURNAROUND_DAYS[module] + num_revisions * DAYS_PER_REVISION
-            cert_date = submission + timedelta(days=span)
-        
-        days_between = span // total_audits if total_audits > 1 else span
-        
-        for i in range(total_audits):
-            offset = min((i + 1) * days_between, span)
-            audit_date = submission + timedelta(days=offset)
-            is_final = (i == total_audits - 1)
-            
-            if is_final and cert_date_str:
-                status, reason = 'PASS', None
-            elif is_final and not cert_date_str:
-                status, reason = 'PENDING', None
-            else:
-                status = 'FAIL'
-                reason = weighted_choice(MODULE_B_FAILURE_REASONS if module == 'B' else MODULE_D_FAILURE_REASONS)
-            
-            audits.append({
-                'audit_id': fmt_audit_id(audit_num),
-                'application_id': app_id,
-                'audit_date': audit_date.strftime('%Y-%m-%d'),
-                'audit_status': status,
-                'failure_reason': reason
-            })
-            audit_num += 1
+    status = np.where(is_final, np.where(is_certified[app_idx], 'PASS', 'PENDING'), 'FAIL')
+    reason = np.full(len(status), None, dtype=object)
+    audit_modules = modules[app_idx]
+    for is_module_b, dist in ((True, MODULE_B_FAILURE_REASONS), (False, MODULE_D_FAILURE_REASONS)):
+        mask = (status == 'FAIL') & ((audit_modules == 'B') == is_module_b)
+        reason[mask] = weighted_choice(dist, mask.sum())
     
-    df = pd.DataFrame(audits)
+    df = pd.DataFrame({
+        'audit_id': np.arange(1, len(status) + 1, dtype=np.int32),
+        'application_id': merged['application_id'].to_numpy()[app_idx],
+        'audit_date': audit_date,
+        'audit_status': status,
+        'failure_reason': reason
+    })
     fail_count = (df['audit_status'] == 'FAIL').sum()
     print(f"Generated {len(df)} audit events ({fail_count} failures)")
     return df
@@ -272,11 +292,11 @@ def main():
     cert_results = generate_cert_results(apps, clients)
     audit_results = generate_audit_results(apps, cert_results)
     
-    # Save CSVs
-    clients.to_csv(os.path.join(output_dir, 'clients.csv'), index=False)
-    apps.to_csv(os.path.join(output_dir, 'applications.csv'), index=False)
-    cert_results.to_csv(os.path.join(output_dir, 'certification_results.csv'), index=False)
-    audit_results.to_csv(os.path.join(output_dir, 'audit_results.csv'), index=False)
+    # Save CSVs - date columns are formatted column-wise by the writer
+    format_ids(clients).to_csv(os.path.join(output_dir, 'clients.csv'), index=False)
+    format_ids(apps).to_csv(os.path.join(output_dir, 'applications.csv'), index=False, date_format=DATE_FORMAT)
+    format_ids(cert_results).to_csv(os.path.join(output_dir, 'certification_results.csv'), index=False, date_format=DATE_FORMAT)
+    format_ids(audit_results).to_csv(os.path.join(output_dir, 'audit_results.csv'), index=False, date_format=DATE_FORMAT)
     
     print(f"\nSaved 4 CSV files to {output_dir}")
 
@@ -19,9 +19,10 @@ import os
 import re
 
 # Expected patterns and values
-CLIENT_ID_PATTERN = r'^CLI\d{4}$'
-APP_ID_PATTERN = r'^APP\d{5}$'
-AUDIT_ID_PATTERN = r'^AUD\d{5}$'
+CLIENT_ID_PATTERN = re.compile(r'^CLI\d{4}$')
+APP_ID_PATTERN = re.compile(r'^APP\d{5}$')
+AUDIT_ID_PATTERN = re.compile(r'^AUD\d{5}$')
+DATE_FORMAT = '%Y-%m-%d'
 
 VALID_MFR_SIZES = ['SME', 'Large']
 VALID_SECTORS = ['Energy', 'Utilities', 'Retail Fuel', 'Transportation', 'Multi-sector']
@@ -30,6 +31,13 @@ VALID_MODULES = ['B', 'D']
 VALID_RISK = ['Low', 'Medium', 'High']
 VALID_STATUS = ['PASS', 'FAIL', 'PENDING']
 
+# Low-cardinality text columns are read as category (small integer codes);
+# categories come from the data itself, so invalid values are kept as-is
+CATEGORY_DTYPES = {col: 'category' for col in [
+    'manufacturer_size', 'sector', 'instrument_type', 'mid_module',
+    'risk_class', 'audit_status', 'failure_reason'
+]}
+
 MAX_REVISIONS = 10
 MAX_TURNAROUND = 365
 MIN_TURNAROUND = 7
@@ -40,15 +48,29 @@ class DataQualityChecker:
     
     def __init__(self, data_dir):
         print("Loading datasets...")
-        self.clients = pd.read_csv(os.path.join(data_dir, 'clients.csv'))
-        self.apps = pd.read_csv(os.path.join(data_dir, 'applications.csv'))
-        self.certs = pd.read_csv(os.path.join(data_dir, 'certification_results.csv'))
-        self.audits = pd.read_csv(os.path.join(data_dir, 'audit_results.csv'))
+        self.clients = pd.read_csv(os.path.join(data_dir, 'clients.csv'), dtype=CATEGORY_DTYPES)
+        self.apps = pd.read_csv(os.path.join(data_dir, 'applications.csv'), dtype=CATEGORY_DTYPES)
+        self.certs = pd.read_csv(os.path.join(data_dir, 'certification_results.csv'), dtype=CATEGORY_DTYPES)
+        self.audits = pd.read_csv(os.path.join(data_dir, 'audit_results.csv'), dtype=CATEGORY_DTYPES)
+        
+        # Parse dates - explicit format skips per-value format inference
+        for df, col in [(self.apps, 'submission_date'), (self.certs, 'certification_date'),
+                        (self.audits, 'audit_date')]:
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors='coerce')
+        
+        # Latest audit per application, shared by checks 1.3 and 5.3 -
+        # stable sort so the last-listed audit wins a same-day tie
+        final = (self.audits.sort_values(['application_id', 'audit_date'], kind='stable')
+                            .drop_duplicates('application_id', keep='last'))
+        self._final_audit = final[['application_id', 'audit_status']].set_index('application_id')
+        
+        # Certified applications with turnaround, shared by checks 3.1 and 3.2
+        merged = self.certs.merge(self.apps[['application_id', 'submission_date']], on='application_id')
+        self._dated = merged[merged['certification_date'].notna()].copy()
+        self._dated['days'] = (self._dated['certification_date'] - self._dated['submission_date']).dt.days
         
-        # Parse dates
-        self.apps['submission_date'] = pd.to_datetime(self.apps['submission_date'], errors='coerce')
-        self.certs['certification_date'] = pd.to_datetime(self.certs['certification_date'], errors='coerce')
-        self.audits['audit_date'] = pd.to_datetime(self.audits['audit_date'], errors='coerce')
+        # Application keys, shared by the referential checks
+        self._app_ids = set(self.apps['application_id'])
         
         self.results = []
         print(f"  {len(self.clients)} clients, {len(self.apps)} applications")
@@ -60,26 +82,30 @@ class DataQualityChecker:
             'issues': issues, 'severity': severity, 'details': details
         })
     
+    @staticmethod
+    def _count_invalid(values, valid):
+        """Count values outside the valid categories (missing counts as invalid)."""
+        return np.count_nonzero(pd.Categorical(values).set_categories(valid).codes == -1)
+    
     # --- 1. COMPLETENESS ---
     
     def check_client_fields(self):
         """All client fields must be populated for valid certificates."""
-        missing = self.clients.isna().sum().sum()
+        missing = np.count_nonzero(self.clients.isna())
         self._add("1.1 Client fields complete", missing == 0, missing, 
                   'CRITICAL' if missing > 0 else 'OK')
     
     def check_app_fields(self):
         """Application fields drive the certification workflow."""
-        missing = self.apps.isna().sum().sum()
+        missing = np.count_nonzero(self.apps.isna())
         self._add("1.2 Application fields complete", missing == 0, missing,
                   'CRITICAL' if missing > 0 else 'OK')
     
     def check_cert_dates(self):
         """Missing cert dates OK only if legitimately pending."""
-        missing = self.certs['certification_date'].isna().sum()
+        missing = np.count_nonzero(self.certs['certification_date'].isna())
         # Get apps with final audit status PENDING
-        final_status = self.audits.sort_values('audit_date').groupby('application_id')['audit_status'].last()
-        legit_pending = (final_status == 'PENDING').sum()
+        legit_pending = np.count_nonzero(self._final_audit['audit_status'] == 'PENDING')
         unexplained = missing - legit_pending
         
         self._add("1.3 Certification dates", unexplained == 0, missing,
@@ -88,7 +114,7 @@ class DataQualityChecker:
     
     def check_audit_dates(self):
         """Audit dates required for regulatory audit trail."""
-        missing = self.audits['audit_date'].isna().sum()
+        missing = np.count_nonzero(self.audits['audit_date'].isna())
         self._add("1.4 Audit dates complete", missing == 0, missing,
                   'CRITICAL' if missing > 0 else 'OK')
     
@@ -96,9 +122,9 @@ class DataQualityChecker:
     
     def check_id_formats(self):
         """Consistent IDs ensure reliable joins."""
-        bad_cli = (~self.clients['client_id'].str.match(CLIENT_ID_PATTERN, na=False)).sum()
-        bad_app = (~self.apps['application_id'].str.match(APP_ID_PATTERN, na=False)).sum()
-        bad_aud = (~self.audits['audit_id'].str.match(AUDIT_ID_PATTERN, na=False)).sum()
+        bad_cli = np.count_nonzero(~self.clients['client_id'].str.match(CLIENT_ID_PATTERN, na=False))
+        bad_app = np.count_nonzero(~self.apps['application_id'].str.match(APP_ID_PATTERN, na=False))
+        bad_aud = np.count_nonzero(~self.audits['audit_id'].str.match(AUDIT_ID_PATTERN, na=False))
         total = bad_cli + bad_app + bad_aud
         self._add("2.1 ID format validity", total == 0, total, 
                   'WARNING' if total > 0 else 'OK')
@@ -106,26 +132,26 @@ class DataQualityChecker:
     def check_categorical_values(self):
         """Invalid categories mean wrong requirements applied."""
         issues = 0
-        issues += (~self.clients['manufacturer_size'].isin(VALID_MFR_SIZES)).sum()
-        issues += (~self.clients['sector'].isin(VALID_SECTORS)).sum()
-        issues += (~self.apps['instrument_type'].isin(VALID_INSTRUMENTS)).sum()
-        issues += (~self.apps['mid_module'].isin(VALID_MODULES)).sum()
-        issues += (~self.apps['risk_class'].isin(VALID_RISK)).sum()
-        issues += (~self.audits['audit_status'].isin(VALID_STATUS)).sum()
+        issues += self._count_invalid(self.clients['manufacturer_size'], VALID_MFR_SIZES)
+        issues += self._count_invalid(self.clients['sector'], VALID_SECTORS)
+        issues += self._count_invalid(self.apps['instrument_type'], VALID_INSTRUMENTS)
+        issues += self._count_invalid(self.apps['mid_module'], VALID_MODULES)
+        issues += self._count_invalid(self.apps['risk_class'], VALID_RISK)
+        issues += self._count_invalid(self.audits['audit_status'], VALID_STATUS)
         self._add("2.2 Categorical values valid", issues == 0, issues,
                   'CRITICAL' if issues > 0 else 'OK')
     
     def check_revision_counts(self):
         """Negative or extreme revisions indicate data errors."""
-        neg = (self.certs['total_revisions'] < 0).sum()
-        high = (self.certs['total_revisions'] > MAX_REVISIONS).sum()
+        neg = np.count_nonzero(self.certs['total_revisions'] < 0)
+        high = np.count_nonzero(self.certs['total_revisions'] > MAX_REVISIONS)
         total = neg + high
         self._add("2.3 Revision counts valid", total == 0, total,
                   'CRITICAL' if neg > 0 else ('WARNING' if high > 0 else 'OK'))
     
     def check_binary_flags(self):
         """passed_first_time must be 0 or 1."""
-        invalid = (~self.certs['passed_first_time'].isin([0, 1])).sum()
+        invalid = np.count_nonzero(~self.certs['passed_first_time'].isin([0, 1]))
         self._add("2.4 Binary flags valid", invalid == 0, invalid,
                   'CRITICAL' if invalid > 0 else 'OK')
     
@@ -133,20 +159,16 @@ class DataQualityChecker:
     
     def check_date_order(self):
         """Certification must occur after submission."""
-        merged = self.certs.merge(self.apps[['application_id', 'submission_date']], on='application_id')
-        dated = merged[merged['certification_date'].notna()]
-        violations = (dated['certification_date'] <= dated['submission_date']).sum()
+        dated = self._dated
+        violations = np.count_nonzero(dated['certification_date'] <= dated['submission_date'])
         self._add("3.1 Date order (submit → cert)", violations == 0, violations,
                   'CRITICAL' if violations > 0 else 'OK')
     
     def check_turnaround_range(self):
         """Turnaround should be 7-365 days."""
-        merged = self.certs.merge(self.apps[['application_id', 'submission_date']], on='application_id')
-        dated = merged[merged['certification_date'].notna()].copy()
-        dated['days'] = (dated['certification_date'] - dated['submission_date']).dt.days
-        
-        short = (dated['days'] < MIN_TURNAROUND).sum()
-        long = (dated['days'] > MAX_TURNAROUND).sum()
+        dated = self._dated
+        short = np.count_nonzero(dated['days'] < MIN_TURNAROUND)
+        long = np.count_nonzero(dated['days'] > MAX_TURNAROUND)
         total = short + long
         self._add("3.2 Turnaround range", total == 0, total,
                   'WARNING' if total > 0 else 'OK',
@@ -154,16 +176,23 @@ class DataQualityChecker:
     
     def check_audit_sequence(self):
         """Audits must be chronologically ordered per application."""
-        violations = 0
-        for app_id, grp in self.audits.groupby('application_id'):
-            if not grp['audit_date'].equals(grp['audit_date'].sort_values()):
-                violations += 1
+        # Stable sort keeps file order within each application
+        by_app = self.audits.sort_values('application_id', kind='stable')
+        ids = by_app['application_id'].to_numpy()
+        dates = by_app['audit_date'].to_numpy()
+        # Missing dates sort last, so only one followed by a dated audit is out of order
+        missing = np.isnat(dates)
+        bad = (ids[1:] == ids[:-1]) & ((dates[1:] < dates[:-1]) | (missing[:-1] & ~missing[1:]))
+        violations = np.unique(ids[1:][bad]).size
         self._add("3.3 Audit date sequence", violations == 0, violations,
                   'WARNING' if violations > 0 else 'OK')
     
     def check_pass_revision_consistency(self):
         """First-time pass must have zero revisions."""
-        bad = ((self.certs['passed_first_time'] == 1) & (self.certs['total_revisions'] > 0)).sum()
+        passed = self.certs['passed_first_time'].to_numpy()
+        revisions = self.certs['total_revisions'].to_numpy()
+        # Only first-time passes need their revisions compared
+        bad = np.count_nonzero(revisions[passed == 1] > 0)
         self._add("3.4 Pass/revision consistency", bad == 0, bad,
                   'CRITICAL' if bad > 0 else 'OK')
     
@@ -172,7 +201,7 @@ class DataQualityChecker:
         counts = self.audits.groupby('application_id').size().reset_index(name='n_audits')
         merged = counts.merge(self.certs[['application_id', 'total_revisions']], on='application_id')
         merged['expected'] = 1 + merged['total_revisions']
-        mismatches = (merged['n_audits'] != merged['expected']).sum()
+        mismatches = np.count_nonzero(merged['n_audits'] != merged['expected'])
         self._add("3.5 Audit count consistency", mismatches == 0, mismatches,
                   'WARNING' if mismatches > 0 else 'OK')
     
@@ -181,30 +210,27 @@ class DataQualityChecker:
     def check_app_client_ref(self):
         """All applications must reference existing clients."""
         valid = set(self.clients['client_id'])
-        orphans = (~self.apps['client_id'].isin(valid)).sum()
+        orphans = np.count_nonzero(~self.apps['client_id'].isin(valid))
         self._add("4.1 App → Client ref", orphans == 0, orphans,
                   'CRITICAL' if orphans > 0 else 'OK')
     
     def check_cert_app_ref(self):
         """All cert results must reference existing applications."""
-        valid = set(self.apps['application_id'])
-        orphans = (~self.certs['application_id'].isin(valid)).sum()
+        orphans = np.count_nonzero(~self.certs['application_id'].isin(self._app_ids))
         self._add("4.2 Cert → App ref", orphans == 0, orphans,
                   'CRITICAL' if orphans > 0 else 'OK')
     
     def check_audit_app_ref(self):
         """All audits must reference existing applications."""
-        valid = set(self.apps['application_id'])
-        orphans = (~self.audits['application_id'].isin(valid)).sum()
+        orphans = np.count_nonzero(~self.audits['application_id'].isin(self._app_ids))
         self._add("4.3 Audit → App ref", orphans == 0, orphans,
                   'CRITICAL' if orphans > 0 else 'OK')
     
     def check_one_to_one_cert(self):
         """Each application needs exactly one certification result."""
-        app_ids = set(self.apps['application_id'])
         cert_ids = set(self.certs['application_id'])
-        missing = len(app_ids - cert_ids)
-        dupes = self.certs.duplicated(subset=['application_id']).sum()
+        missing = len(self._app_ids - cert_ids)
+        dupes = np.count_nonzero(self.certs.duplicated(subset=['application_id']))
         total = missing + dupes
         self._add("4.4 One-to-one app↔cert", total == 0, total,
                   'CRITICAL' if total > 0 else 'OK')
@@ -214,26 +240,25 @@ class DataQualityChecker:
     def check_fail_has_reason(self):
         """Failed audits must document the reason."""
         failed = self.audits[self.audits['audit_status'] == 'FAIL']
-        no_reason = failed['failure_reason'].isna().sum()
+        no_reason = np.count_nonzero(failed['failure_reason'].isna())
         self._add("5.1 FAIL has reason", no_reason == 0, no_reason,
                   'CRITICAL' if no_reason > 0 else 'OK')
     
     def check_pass_no_reason(self):
         """Passed audits should not have failure reasons."""
         passed = self.audits[self.audits['audit_status'] == 'PASS']
-        has_reason = passed['failure_reason'].notna().sum()
+        has_reason = np.count_nonzero(passed['failure_reason'].notna())
         self._add("5.2 PASS has no reason", has_reason == 0, has_reason,
                   'WARNING' if has_reason > 0 else 'OK')
     
     def check_final_status_alignment(self):
         """Final audit status should align with cert date existence."""
-        final = self.audits.sort_values('audit_date').groupby('application_id').last()
-        merged = final.merge(self.certs[['application_id', 'certification_date']], on='application_id')
+        merged = self._final_audit.merge(self.certs[['application_id', 'certification_date']], on='application_id')
         
         # Certified but not PASS
-        cert_not_pass = ((merged['certification_date'].notna()) & (merged['audit_status'] != 'PASS')).sum()
+        cert_not_pass = np.count_nonzero((merged['certification_date'].notna()) & (merged['audit_status'] != 'PASS'))
         # PASS but not certified
-        pass_no_cert = ((merged['certification_date'].isna()) & (merged['audit_status'] == 'PASS')).sum()
+        pass_no_cert = np.count_nonzero((merged['certification_date'].isna()) & (merged['audit_status'] == 'PASS'))
         
         total = cert_not_pass + pass_no_cert
         self._add("5.3 Final audit↔cert alignment", total == 0, total,
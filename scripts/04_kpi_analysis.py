@@ -7,6 +7,9 @@ Metrics: success rate, turnaround time, revisions, failure rate, throughput.
 import sqlite3
 import pandas as pd
 import os
+from decimal import Decimal, ROUND_HALF_UP
+
+from snapshots import refresh_mv
 
 
 def get_db_path():
@@ -14,6 +17,20 @@ def get_db_path():
     return os.path.join(os.path.dirname(script_dir), 'data', 'certification.db')
 
 
+def connect(db_path):
+    """In-memory copy of the database - the KPI queries only read, so nothing is written back."""
+    src = sqlite3.connect(db_path, timeout=30)
+    conn = sqlite3.connect(':memory:')
+    try:
+        # Bring the snapshot tables up to date on disk before copying
+        refresh_mv(src)
+        src.backup(conn)
+    finally:
+        src.close()
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
 def print_section(title):
     print(f"\n--- {title} ---")
 
@@ -31,135 +48,139 @@ def show(conn, title, sql):
     return df
 
 
-def kpi_1_success_rate(conn):
-    """First-time certification success rate."""
-    
-    show(conn, "1a. Overall Success Rate", """
-        SELECT 
-            COUNT(*) AS total,
-            SUM(passed_first_time) AS first_time_passes,
-            ROUND(AVG(passed_first_time) * 100, 1) AS success_pct
-        FROM certification_results
-        WHERE certification_date IS NOT NULL
-    """)
+def load_details(conn):
+    """Application-level KPI base - one scan of v_application_details."""
+    df = query(conn, "SELECT * FROM v_application_details")
+    for col in ['mid_module', 'instrument_type', 'manufacturer_size']:
+        df[col] = df[col].astype('category')
+    return df
+
+
+def show_df(title, df):
+    """Print a computed KPI table."""
+    print_section(title)
+    print(df.to_string(index=False))
+    return df
+
+
+def sql_round(x, digits):
+    """Round like SQLite's ROUND(): half away from zero, on 15 significant digits.
     
-    show(conn, "1b. Success by Module", """
-        SELECT 
-            a.mid_module,
-            COUNT(*) AS apps,
-            ROUND(AVG(cr.passed_first_time) * 100, 1) AS success_pct
-        FROM applications a
-        JOIN certification_results cr ON a.application_id = cr.application_id
-        WHERE cr.certification_date IS NOT NULL
-        GROUP BY a.mid_module
-        ORDER BY success_pct DESC
-    """)
+    pandas .round() and round() round half to even, which would shift
+    KPIs whose mean lands exactly on a half. Missing values come back as
+    None, as ROUND(NULL) does.
+    """
+    if isinstance(x, pd.Series):
+        return x.map(lambda v: sql_round(v, digits))
+    if pd.isna(x):
+        return None
+    return float(Decimal(f"{x:.15g}").quantize(Decimal(1).scaleb(-digits), ROUND_HALF_UP))
+
+
+def completed(df):
+    """Applications with a certification date."""
+    return df[df['certification_date'].notna()]
+
+
+def success_by(done, col, count_name='apps', order_by='success_pct'):
+    """Count and first-time success % per group."""
+    out = (done.groupby(col, observed=True)['passed_first_time']
+               .agg(**{count_name: 'size', 'success_pct': 'mean'})
+               .reset_index())
+    out['success_pct'] = sql_round(out['success_pct'] * 100, 1)
+    return out.sort_values(order_by, ascending=False, kind='stable')
+
+
+def turnaround_by(done, col, count_name):
+    """Count and average turnaround days per group."""
+    out = (done.groupby(col, observed=True)['turnaround_days']
+               .agg(**{count_name: 'size', 'avg_days': 'mean'})
+               .reset_index())
+    out['avg_days'] = sql_round(out['avg_days'], 1)
+    return out
+
+
+def kpi_1_success_rate(df):
+    """First-time certification success rate."""
+    done = completed(df)
     
-    show(conn, "1c. Success by Manufacturer Size", """
-        SELECT 
-            c.manufacturer_size,
-            COUNT(*) AS apps,
-            ROUND(AVG(cr.passed_first_time) * 100, 1) AS success_pct
-        FROM clients c
-        JOIN applications a ON c.client_id = a.client_id
-        JOIN certification_results cr ON a.application_id = cr.application_id
-        WHERE cr.certification_date IS NOT NULL
-        GROUP BY c.manufacturer_size
-        ORDER BY success_pct DESC
-    """)
+    show_df("1a. Overall Success Rate", pd.DataFrame({
+        'total': [len(done)],
+        'first_time_passes': [done['passed_first_time'].sum()],
+        'success_pct': [sql_round(done['passed_first_time'].mean() * 100, 1)]
+    }))
     
-    show(conn, "1d. Success by Instrument", """
-        SELECT 
-            a.instrument_type,
-            COUNT(*) AS apps,
-            ROUND(AVG(cr.passed_first_time) * 100, 1) AS success_pct
-        FROM applications a
-        JOIN certification_results cr ON a.application_id = cr.application_id
-        WHERE cr.certification_date IS NOT NULL
-        GROUP BY a.instrument_type
-        ORDER BY success_pct DESC
-    """)
+    show_df("1b. Success by Module", success_by(done, 'mid_module'))
+    show_df("1c. Success by Manufacturer Size", success_by(done, 'manufacturer_size'))
+    show_df("1d. Success by Instrument", success_by(done, 'instrument_type'))
 
 
-def kpi_2_turnaround(conn):
+def kpi_2_turnaround(df):
     """Certification turnaround time in days."""
+    done = completed(df)
+    days = done['turnaround_days']
     
-    show(conn, "2a. Overall Turnaround", """
-        SELECT 
-            COUNT(*) AS completed,
-            ROUND(AVG(turnaround_days), 1) AS avg_days,
-            MIN(turnaround_days) AS min_days,
-            MAX(turnaround_days) AS max_days
-        FROM v_application_details
-        WHERE certification_date IS NOT NULL
-    """)
+    # Nothing certified yet prints None, as SQL aggregates over no rows do
+    empty = done.empty
+    show_df("2a. Overall Turnaround", pd.DataFrame({
+        'completed': [len(done)],
+        'avg_days': [sql_round(days.mean(), 1)],
+        'min_days': [None if empty else int(days.min())],
+        'max_days': [None if empty else int(days.max())]
+    }))
     
-    show(conn, "2b. Turnaround by Module", """
-        SELECT 
-            mid_module,
-            COUNT(*) AS completed,
-            ROUND(AVG(turnaround_days), 1) AS avg_days
-        FROM v_application_details
-        WHERE certification_date IS NOT NULL
-        GROUP BY mid_module
-    """)
+    show_df("2b. Turnaround by Module", turnaround_by(done, 'mid_module', 'completed'))
     
-    show(conn, "2c. First-Time Pass vs Revisions", """
-        SELECT 
-            CASE WHEN passed_first_time = 1 THEN 'First-time' ELSE 'Revisions' END AS outcome,
-            COUNT(*) AS apps,
-            ROUND(AVG(turnaround_days), 1) AS avg_days
-        FROM v_application_details
-        WHERE certification_date IS NOT NULL
-        GROUP BY passed_first_time
-    """)
+    outcome = turnaround_by(done, 'passed_first_time', 'apps')
+    outcome.insert(0, 'outcome', outcome.pop('passed_first_time').map({1: 'First-time', 0: 'Revisions'}))
+    show_df("2c. First-Time Pass vs Revisions", outcome)
     
-    show(conn, "2d. Turnaround by Revision Count", """
-        SELECT total_revisions, COUNT(*) AS apps, ROUND(AVG(turnaround_days), 1) AS avg_days
-        FROM v_application_details
-        WHERE certification_date IS NOT NULL
-        GROUP BY total_revisions
-        ORDER BY total_revisions
-    """)
+    show_df("2d. Turnaround by Revision Count", turnaround_by(done, 'total_revisions', 'apps'))
 
 
-def kpi_3_revisions(conn):
+def kpi_3_revisions(df):
     """Revisions per client analysis."""
     
-    show(conn, "3a. Revisions by Manufacturer Size", """
-        SELECT 
-            c.manufacturer_size,
-            COUNT(DISTINCT c.client_id) AS clients,
-            SUM(cr.total_revisions) AS total_revs,
-            ROUND(AVG(cr.total_revisions), 2) AS avg_per_app
-        FROM clients c
-        JOIN applications a ON c.client_id = a.client_id
-        JOIN certification_results cr ON a.application_id = cr.application_id
-        GROUP BY c.manufacturer_size
-    """)
+    by_size = (df.groupby('manufacturer_size', observed=True)
+                 .agg(clients=('client_id', 'nunique'),
+                      total_revs=('total_revisions', 'sum'),
+                      avg_per_app=('total_revisions', 'mean'))
+                 .reset_index())
+    by_size['avg_per_app'] = sql_round(by_size['avg_per_app'], 2)
+    show_df("3a. Revisions by Manufacturer Size", by_size)
     
-    show(conn, "3b. Top 10 Clients by Revisions", """
-        SELECT 
-            c.company_name,
-            c.manufacturer_size AS size,
-            COUNT(*) AS apps,
-            SUM(cr.total_revisions) AS revisions
-        FROM clients c
-        JOIN applications a ON c.client_id = a.client_id
-        JOIN certification_results cr ON a.application_id = cr.application_id
-        GROUP BY c.client_id
-        ORDER BY revisions DESC
-        LIMIT 10
-    """)
+    by_client = (df.groupby('client_id')
+                   .agg(company_name=('company_name', 'first'),
+                        size=('manufacturer_size', 'first'),
+                        apps=('application_id', 'size'),
+                        revisions=('total_revisions', 'sum'))
+                   .sort_values('revisions', ascending=False, kind='stable'))
+    show_df("3b. Top 10 Clients by Revisions", by_client.head(10))
     
-    show(conn, "3c. Revision Distribution", """
+    dist = df.groupby('total_revisions').size().reset_index(name='apps').rename(columns={'total_revisions': 'revs'})
+    dist['pct'] = sql_round(dist['apps'] * 100.0 / len(df), 1)
+    show_df("3c. Revision Distribution", dist)
+
+
+def precompute_kpis(conn):
+    """Materialise the audit-level aggregates the reports slice, once per connection."""
+    conn.executescript("""
+        DROP TABLE IF EXISTS temp.k_audits;
+        CREATE TEMP TABLE k_audits AS
         SELECT 
-            total_revisions AS revs,
-            COUNT(*) AS apps,
-            ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM certification_results), 1) AS pct
-        FROM certification_results
-        GROUP BY total_revisions
-        ORDER BY total_revisions
+            a.mid_module,
+            COUNT(*) AS audits,
+            SUM(CASE WHEN ar.audit_status = 'FAIL' THEN 1 ELSE 0 END) AS failures
+        FROM audit_results ar
+        JOIN applications a ON ar.application_id = a.application_id
+        WHERE ar.audit_status != 'PENDING'
+        GROUP BY a.mid_module;
+        
+        DROP TABLE IF EXISTS temp.k_failures;
+        CREATE TEMP TABLE k_failures AS
+        SELECT mid_module, failure_reason, COUNT(*) AS n
+        FROM v_failures
+        GROUP BY mid_module, failure_reason;
     """)
 
 
@@ -168,46 +189,40 @@ def kpi_4_failure_rate(conn):
     
     show(conn, "4a. Overall Failure Rate", """
         SELECT 
-            COUNT(*) AS audits,
-            SUM(CASE WHEN audit_status = 'FAIL' THEN 1 ELSE 0 END) AS failures,
-            ROUND(SUM(CASE WHEN audit_status = 'FAIL' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 1) AS fail_pct
-        FROM audit_results
-        WHERE audit_status != 'PENDING'
+            SUM(audits) AS audits,
+            SUM(failures) AS failures,
+            ROUND(SUM(failures) * 100.0 / SUM(audits), 1) AS fail_pct
+        FROM temp.k_audits
     """)
     
     show(conn, "4b. Failure Rate by Module", """
-        SELECT 
-            a.mid_module,
-            COUNT(*) AS audits,
-            ROUND(SUM(CASE WHEN ar.audit_status = 'FAIL' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 1) AS fail_pct
-        FROM audit_results ar
-        JOIN applications a ON ar.application_id = a.application_id
-        WHERE ar.audit_status != 'PENDING'
-        GROUP BY a.mid_module
+        SELECT mid_module, audits, ROUND(failures * 100.0 / audits, 1) AS fail_pct
+        FROM temp.k_audits
+        ORDER BY mid_module
     """)
     
     show(conn, "4c. Top Failure Reasons", """
-        SELECT failure_reason, COUNT(*) AS n
-        FROM v_failures
+        SELECT failure_reason, SUM(n) AS n
+        FROM temp.k_failures
         GROUP BY failure_reason
-        ORDER BY n DESC
+        ORDER BY n DESC, failure_reason
         LIMIT 10
     """)
     
     show(conn, "4d. Module B Failures", """
-        SELECT failure_reason, COUNT(*) AS n
-        FROM v_failures WHERE mid_module = 'B'
-        GROUP BY failure_reason ORDER BY n DESC LIMIT 5
+        SELECT failure_reason, n
+        FROM temp.k_failures WHERE mid_module = 'B'
+        ORDER BY n DESC, failure_reason LIMIT 5
     """)
     
     show(conn, "4e. Module D Failures", """
-        SELECT failure_reason, COUNT(*) AS n
-        FROM v_failures WHERE mid_module = 'D'
-        GROUP BY failure_reason ORDER BY n DESC LIMIT 5
+        SELECT failure_reason, n
+        FROM temp.k_failures WHERE mid_module = 'D'
+        ORDER BY n DESC, failure_reason LIMIT 5
     """)
 
 
-def kpi_5_throughput(conn):
+def kpi_5_throughput(conn, df):
     """Monthly certification throughput."""
     
     show(conn, "5a. Monthly Trend", """
@@ -219,74 +234,56 @@ def kpi_5_throughput(conn):
     show(conn, "5b. Quarterly Summary", """
         SELECT 
             substr(month, 1, 4) || '-Q' || 
-            CASE 
-                WHEN substr(month, 6, 2) IN ('01','02','03') THEN '1'
-                WHEN substr(month, 6, 2) IN ('04','05','06') THEN '2'
-                WHEN substr(month, 6, 2) IN ('07','08','09') THEN '3'
-                ELSE '4'
-            END AS quarter,
+            ((CAST(substr(month, 6, 2) AS INTEGER) - 1) / 3 + 1) AS quarter,
             SUM(certifications) AS certs,
             ROUND(AVG(success_rate), 1) AS avg_success
         FROM v_monthly_throughput
         GROUP BY quarter
     """)
     
-    show(conn, "5c. By Instrument Type", """
-        SELECT instrument_type, COUNT(*) AS certs, ROUND(AVG(passed_first_time) * 100, 1) AS success_pct
-        FROM v_application_details
-        WHERE certification_date IS NOT NULL
-        GROUP BY instrument_type
-        ORDER BY certs DESC
-    """)
+    show_df("5c. By Instrument Type",
+            success_by(completed(df), 'instrument_type', count_name='certs', order_by='certs'))
 
 
-def summary(conn):
+def summary(conn, df):
     """Executive summary."""
     print_section("EXECUTIVE SUMMARY")
     
-    df = query(conn, """
-        SELECT 
-            COUNT(*) AS apps,
-            SUM(passed_first_time) AS passes,
-            ROUND(AVG(passed_first_time) * 100, 1) AS success_pct,
-            ROUND(AVG(total_revisions), 2) AS avg_revs,
-            ROUND(AVG(turnaround_days), 1) AS avg_days
-        FROM v_application_details
-        WHERE certification_date IS NOT NULL
-    """)
-    
-    r = df.iloc[0]
-    print(f"Completed: {r['apps']} applications")
-    print(f"Success rate: {r['success_pct']}%")
-    print(f"Avg revisions: {r['avg_revs']}")
-    print(f"Avg turnaround: {r['avg_days']} days")
+    done = completed(df)
+    print(f"Completed: {len(done)} applications")
+    print(f"Success rate: {sql_round(done['passed_first_time'].mean() * 100, 1)}%")
+    print(f"Avg revisions: {sql_round(done['total_revisions'].mean(), 2)}")
+    print(f"Avg turnaround: {sql_round(done['turnaround_days'].mean(), 1)} days")
     
     print("\nModule comparison:")
     df_mod = query(conn, "SELECT * FROM v_module_comparison")
-    for _, row in df_mod.iterrows():
-        print(f"  {row['mid_module']}: {row['success_rate']}% success, {row['avg_days']} days")
+    for row in df_mod.itertuples(index=False):
+        print(f"  {row.mid_module}: {row.success_rate}% success, {row.avg_days} days")
     
     print("\nTop failures:")
     df_fail = query(conn, """
-        SELECT failure_reason, COUNT(*) n FROM v_failures
-        GROUP BY failure_reason ORDER BY n DESC LIMIT 3
+        SELECT failure_reason, SUM(n) n FROM temp.k_failures
+        GROUP BY failure_reason ORDER BY n DESC, failure_reason LIMIT 3
     """)
-    for _, row in df_fail.iterrows():
-        print(f"  - {row['failure_reason']} ({row['n']})")
+    for row in df_fail.itertuples(index=False):
+        print(f"  - {row.failure_reason} ({row.n})")
 
 
 def main():
     db_path = get_db_path()
-    conn = sqlite3.connect(db_path)
+    conn = connect(db_path)
     
     try:
         print(f"Database: {db_path}")
-        kpi_1_success_rate(conn)
-        kpi_2_turnaround(conn)
-        kpi_3_revisions(conn)
+        # Application-level KPIs share one scan; audit-level ones stay in SQL
+        df = load_details(conn)
+        kpi_1_success_rate(df)
+        kpi_2_turnaround(df)
+        kpi_3_revisions(df)
+        precompute_kpis(conn)
         kpi_4_failure_rate(conn)
-        kpi_5_throughput(conn)
-        summary(conn)
+        kpi_5_throughput(conn, df)
+        summary(conn, df)
     finally:
         conn.close()
 
@@ -2,7 +2,34 @@
 
 import sqlite3
 import pandas as pd
+import numpy as np
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+from snapshots import refresh_mv
+
+# Pre-submission action per historical failure reason
+FAILURE_ACTIONS = {
+    'Technical file incomplete': 'Verify technical file contains all sections per MID Annex requirements',
+    'Documentation inconsistencies': 'Cross-check all document references and version numbers',
+    'Test report gaps': 'Confirm test reports cover all applicable MID essential requirements',
+    'Metrological requirements unclear': 'Review metrological characteristics against MID Annex MI-001 to MI-010',
+    'Software documentation missing': 'Include software architecture, version control, and validation records',
+    'Durability evidence insufficient': 'Provide durability test results or field performance data',
+    'Marking/labelling non-compliant': 'Check CE marking, NB number, and instrument labelling requirements',
+    'EMC test results missing': 'Include EMC test reports per EN 61326 or equivalent',
+    'Training records missing': 'Verify training records for all personnel in scope',
+    'Internal audit gaps': 'Review internal audit schedule and findings closure',
+    'Calibration records outdated': 'Check calibration status of all measurement equipment',
+    'Non-conformance handling unclear': 'Document NCR process with examples of recent closures',
+    'Production process not documented': 'Map production process with quality control points',
+    'Supplier control insufficient': 'Include approved supplier list and evaluation records',
+    'Management review incomplete': 'Provide recent management review minutes with actions',
+    'Corrective action records missing': 'Document CAPA process with closure evidence'
+}
+ACTION_TEXTS = np.array(list(FAILURE_ACTIONS.values()), dtype=object)
 
 
 def get_db_path():
@@ -10,6 +37,21 @@ def get_db_path():
     return os.path.join(os.path.dirname(script_dir), 'data', 'certification.db')
 
 
+def connect(db_path, read_only=False):
+    """Read-side connection - wait out a concurrent loader and keep pages in memory."""
+    if read_only:
+        conn = sqlite3.connect(f"{Path(db_path).as_uri()}?mode=ro", timeout=30, uri=True)
+    else:
+        conn = sqlite3.connect(db_path, timeout=30)
+    for pragma in [
+        "temp_store = MEMORY",
+        "cache_size = -200000",      # ~200 MB page cache
+        "mmap_size = 268435456"      # 256 MB memory-mapped I/O
+    ]:
+        conn.execute(f"PRAGMA {pragma}")
+    return conn
+
+
 def analyze_failures(conn):
     print("--- Failure Analysis ---\n")
     
@@ -28,8 +70,8 @@ def analyze_failures(conn):
         FROM v_failures GROUP BY mid_module
     """, conn)
     print(f"\nBy module:")
-    for _, r in by_module.iterrows():
-        print(f"  Module {r['mid_module']}: {r['failures']} failures")
+    for r in by_module.itertuples(index=False):
+        print(f"  Module {r.mid_module}: {r.failures} failures")
     
     return stats
 
@@ -62,10 +104,10 @@ def calculate_impact(conn):
     
     print(f"\nDays added per revision:")
     baseline = impact['passed_avg']
-    for _, r in revisions.iterrows():
-        delta = r['avg_days'] - baseline
-        per_rev = delta / r['total_revisions']
-        print(f"  {r['total_revisions']} revisions: +{delta:.0f} days (~{per_rev:.0f} days/revision)")
+    revisions['delta'] = revisions['avg_days'] - baseline
+    revisions['per_rev'] = revisions['delta'] / revisions['total_revisions']
+    for r in revisions.itertuples(index=False):
+        print(f"  {r.total_revisions} revisions: +{r.delta:.0f} days (~{r.per_rev:.0f} days/revision)")
     
     return delay_per_failure
 
@@ -74,51 +116,51 @@ def build_checklist(conn, module=None):
     where = f"WHERE mid_module = '{module}'" if module else ""
     title = f"Module {module}" if module else "All Modules"
     
+    # Total counted once and bound as a parameter, not re-evaluated per row
+    total = conn.execute(f"SELECT COUNT(*) FROM v_failures {where}").fetchone()[0]
+    
+    # Running share and priority band computed by SQLite in the same query;
+    # the RANGE frame gives reasons with equal counts one shared band
     df = pd.read_sql_query(f"""
         SELECT 
-            failure_reason,
-            COUNT(*) AS occurrences,
-            ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM v_failures {where}), 1) AS pct
-        FROM v_failures
-        {where}
-        GROUP BY failure_reason
-        ORDER BY occurrences DESC
-    """, conn)
-    
-    df['cumulative_pct'] = df['pct'].cumsum()
-    
-    def assign_priority(row):
-        if row['cumulative_pct'] <= 50:
-            return 'HIGH'
-        elif row['cumulative_pct'] <= 80:
-            return 'MEDIUM'
-        return 'LOW'
-    
-    df['priority'] = df.apply(assign_priority, axis=1)
+            *,
+            CASE 
+                WHEN cumulative_pct <= 50 THEN 'HIGH'
+                WHEN cumulative_pct <= 80 THEN 'MEDIUM'
+                ELSE 'LOW'
+            END AS priority
+        FROM (
+            SELECT 
+                *,
+                SUM(pct) OVER (ORDER BY occurrences DESC
+                               RANGE UNBOUNDED PRECEDING) AS cumulative_pct
+            FROM (
+                SELECT 
+                    failure_reason,
+                    COUNT(*) AS occurrences,
+                    ROUND(COUNT(*) * 100.0 / ?, 1) AS pct
+                FROM v_failures
+                {where}
+                GROUP BY failure_reason
+            )
+        )
+        ORDER BY occurrences DESC, failure_reason
+    """, conn, params=(total,))
     
     return df, title
 
 
+def checklist_for(db_path, module=None):
+    """build_checklist on its own read-only connection, for use from a worker thread."""
+    conn = connect(db_path, read_only=True)
+    try:
+        return build_checklist(conn, module)
+    finally:
+        conn.close()
+
+
 def failure_to_action(reason):
-    actions = {
-        'Technical file incomplete': 'Verify technical file contains all sections per MID Annex requirements',
-        'Documentation inconsistencies': 'Cross-check all document references and version numbers',
-        'Test report gaps': 'Confirm test reports cover all applicable MID essential requirements',
-        'Metrological requirements unclear': 'Review metrological characteristics against MID Annex MI-001 to MI-010',
-        'Software documentation missing': 'Include software architecture, version control, and validation records',
-        'Durability evidence insufficient': 'Provide durability test results or field performance data',
-        'Marking/labelling non-compliant': 'Check CE marking, NB number, and instrument labelling requirements',
-        'EMC test results missing': 'Include EMC test reports per EN 61326 or equivalent',
-        'Training records missing': 'Verify training records for all personnel in scope',
-        'Internal audit gaps': 'Review internal audit schedule and findings closure',
-        'Calibration records outdated': 'Check calibration status of all measurement equipment',
-        'Non-conformance handling unclear': 'Document NCR process with examples of recent closures',
-        'Production process not documented': 'Map production process with quality control points',
-        'Supplier control insufficient': 'Include approved supplier list and evaluation records',
-        'Management review incomplete': 'Provide recent management review minutes with actions',
-        'Corrective action records missing': 'Document CAPA process with closure evidence'
-    }
-    return actions.get(reason, f'Review: {reason}')
+    return FAILURE_ACTIONS.get(reason, f'Review: {reason}')
 
 
 def print_checklist(df, title):
@@ -131,10 +173,10 @@ def print_checklist(df, title):
         if items.empty:
             continue
         print(f"\n[{priority} PRIORITY]")
-        for _, row in items.iterrows():
-            print(f"\n  □ {failure_to_action(row['failure_reason'])}")
-            print(f"    Issue: {row['failure_reason']}")
-            print(f"    Frequency: {row['occurrences']} ({row['pct']}%)")
+        for row in items.itertuples(index=False):
+            print(f"\n  □ {failure_to_action(row.failure_reason)}")
+            print(f"    Issue: {row.failure_reason}")
+            print(f"    Frequency: {row.occurrences} ({row.pct}%)")
 
 
 def estimate_savings(conn):
@@ -184,18 +226,27 @@ def export_csv(conn):
     script_dir = os.path.dirname(os.path.abspath(__file__))
     output_dir = os.path.join(os.path.dirname(script_dir), 'data')
     
+    # Grand total taken over the grouped rows, so v_failures is read once
     df = pd.read_sql_query("""
         SELECT 
             failure_reason,
             mid_module,
             COUNT(*) AS occurrences,
-            ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM v_failures), 1) AS pct_total
+            ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER (), 1) AS pct_total
         FROM v_failures
         GROUP BY failure_reason, mid_module
         ORDER BY occurrences DESC
     """, conn)
     
-    df['checklist_item'] = df['failure_reason'].apply(failure_to_action)
+    # Gather actions by category code; -1 marks reasons with no mapped action
+    codes = pd.Categorical(df['failure_reason']).set_categories(list(FAILURE_ACTIONS)).codes
+    items = ACTION_TEXTS[codes]
+    unknown = codes == -1
+    # Unmapped reasons go through failure_to_action; a NULL reason reads as None
+    reasons = df['failure_reason'].astype(object)
+    reasons = reasons.where(reasons.notna(), None).to_numpy()
+    items[unknown] = [failure_to_action(r) for r in reasons[unknown]]
+    df['checklist_item'] = items
     output_path = os.path.join(output_dir, 'checklist_items.csv')
     df.to_csv(output_path, index=False)
     print(f"\nExported: {output_path}")
@@ -204,15 +255,24 @@ def export_csv(conn):
 
 
 def main():
-    conn = sqlite3.connect(get_db_path())
+    db_path = get_db_path()
+    modules = [None, 'B', 'D']
+    conn = connect(db_path)
     
     try:
-        analyze_failures(conn)
-        calculate_impact(conn)
+        # Snapshots must be current before the read-only workers start
+        refresh_mv(conn)
         
-        for module in [None, 'B', 'D']:
-            df, title = build_checklist(conn, module)
-            print_checklist(df, title)
+        # Per-module checklists query in parallel while the analysis runs;
+        # sqlite3 releases the GIL while a statement executes
+        with ThreadPoolExecutor(len(modules)) as pool:
+            checklists = pool.map(partial(checklist_for, db_path), modules)
+            
+            analyze_failures(conn)
+            calculate_impact(conn)
+            
+            for df, title in checklists:
+                print_checklist(df, title)
         
         estimate_savings(conn)
         export_csv(conn)
@@ -0,0 +1,73 @@
+"""
+Snapshot tables behind the reporting views, and their incremental refresh.
+
+03_load_to_sqlite.py builds the tables and the mv_changes log; the
+reporting scripts call refresh_mv() before reading them.
+"""
+
+# Snapshot tables behind the heavily reused views, keyed by application_id
+MV_QUERIES = {
+    # Full application details with turnaround calculation
+    'mv_application_details': """
+        SELECT 
+            a.application_id,
+            a.submission_date,
+            a.instrument_type,
+            a.mid_module,
+            a.risk_class,
+            c.client_id,
+            c.company_name,
+            c.manufacturer_size,
+            c.sector,
+            cr.passed_first_time,
+            cr.total_revisions,
+            cr.certification_date,
+            CAST(julianday(cr.certification_date) - julianday(a.submission_date) AS INTEGER) AS turnaround_days
+        FROM applications a
+        JOIN clients c ON a.client_id = c.client_id
+        JOIN certification_results cr ON a.application_id = cr.application_id
+    """,
+    # Failed audits with context
+    'mv_failures': """
+        SELECT 
+            ar.audit_id,
+            ar.application_id,
+            ar.audit_date,
+            ar.failure_reason,
+            a.mid_module,
+            a.instrument_type,
+            a.risk_class,
+            c.manufacturer_size
+        FROM audit_results ar
+        JOIN applications a ON ar.application_id = a.application_id
+        JOIN clients c ON a.client_id = c.client_id
+        WHERE ar.audit_status = 'FAIL'
+    """
+}
+
+
+def refresh_mv(conn):
+    """Apply logged changes to the snapshot tables; cost scales with the change count.
+    
+    Rows for each changed application are deleted and re-derived from the
+    base tables, then the log is cleared. Returns the number of applications
+    refreshed - 0 for a database built without the change log.
+    """
+    cur = conn.cursor()
+    if cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mv_changes'").fetchone() is None:
+        return 0
+    
+    n = cur.execute("SELECT COUNT(*) FROM mv_changes").fetchone()[0]
+    if n == 0:
+        return 0
+    
+    for mv, sql in MV_QUERIES.items():
+        cur.execute(f"DELETE FROM {mv} WHERE application_id IN (SELECT application_id FROM mv_changes)")
+        cur.execute(f"""
+            INSERT INTO {mv}
+            SELECT * FROM ({sql}) WHERE application_id IN (SELECT application_id FROM mv_changes)
+        """)
+    cur.execute("DELETE FROM mv_changes")
+    
+    conn.commit()
+    return n